@@ -0,0 +1,37 @@
+"""
+One-off migration: merge duplicate inventory records by SKU
+
+The old find-then-insert seeding in POST /items could race into several inventory
+documents for the same SKU, which blocks the unique sku index built at startup.
+This folds each group into one record (summing on_hand) and deletes the rest.
+
+Run it once with the API stopped, then restart the server:
+
+    python dedupe_inventory.py
+"""
+
+import asyncio
+
+from database import db
+
+
+async def dedupe_inventory_skus():
+    dupes = await db["inventory"].aggregate(
+        [
+            {"$group": {"_id": "$sku", "ids": {"$push": "$_id"}, "on_hand": {"$sum": "$on_hand"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+        ]
+    ).to_list(length=None)
+    for d in dupes:
+        keep, *extra = d["ids"]
+        await db["inventory"].update_one({"_id": keep}, {"$set": {"on_hand": d["on_hand"]}})
+        await db["inventory"].delete_many({"_id": {"$in": extra}})
+        print(f"Merged {len(extra)} duplicate inventory records for sku {d['_id']!r}")
+    return len(dupes)
+
+
+if __name__ == "__main__":
+    if db is None:
+        raise SystemExit("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    merged = asyncio.run(dedupe_inventory_skus())
+    print(f"Done: {merged} SKU(s) merged")
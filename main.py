@@ -1,15 +1,31 @@
+import asyncio
+import logging
 import os
+import re
 from datetime import datetime, timezone
 from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
+from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.coder import Coder
+from fastapi_cache.decorator import cache
+from pydantic import BaseModel, Field, TypeAdapter
 from bson import ObjectId
+import orjson
+from pymongo import ReturnDocument, UpdateOne
+from redis import asyncio as aioredis
 
 from database import db, create_document, get_documents
+from schemas import MAX_LINES
 
-app = FastAPI(title="E-Procurement API")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="E-Procurement API", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,20 +35,126 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ---------- Utilities ----------
 
-def oid(id_str: str) -> ObjectId:
+PR_STATUS_INDEX = [("status", 1), ("manager_id", 1), ("employee_id", 1), ("created_at", -1), ("_id", -1)]
+PR_CREATED_INDEX = [("created_at", -1), ("_id", -1)]
+
+# PR index specs confirmed to exist at startup; list_prs only hints these, since hinting
+# a missing index makes the server reject the query
+available_pr_hints = set()
+
+
+# (collection, keys, options) for every index the API relies on
+INDEXES = [
+    ("purchaserequest", PR_STATUS_INDEX, {}),
+    ("purchaserequest", PR_CREATED_INDEX, {}),
+    ("purchaseorder", [("status", 1), ("created_at", -1), ("_id", -1)], {}),
+    ("notification", [("read", 1), ("to_user_id", 1), ("role", 1), ("created_at", -1), ("_id", -1)], {}),
+    ("inventory", [("sku", 1)], {"unique": True}),
+    ("user", [("role", 1), ("is_active", 1)], {}),
+    ("goodsreceipt", [("po_id", 1)], {}),
+    ("goodsreceipt", [("created_at", -1), ("_id", -1)], {}),
+]
+
+
+@app.on_event("startup")
+async def ensure_indexes():
+    # Compound indexes follow Equality-Sort-Range so hot list queries use an IXSCAN
+    # and return results already ordered by the (created_at, _id) pagination key.
+    if db is None:
+        return
+    # Index setup must not keep the API from starting; /test reports database problems.
+    # Each index is attempted on its own so one failure doesn't skip the rest.
+    for collection, keys, options in INDEXES:
+        try:
+            await db[collection].create_index(keys, **options)
+        except Exception:
+            # Duplicate SKUs block the unique sku index; run dedupe_inventory.py once to merge them
+            logger.exception("Failed to create index %s on %s", keys, collection)
+
     try:
-        return ObjectId(id_str)
+        existing = [list(info["key"]) for info in (await db["purchaserequest"].index_information()).values()]
     except Exception:
-        raise HTTPException(status_code=400, detail="Invalid id format")
+        logger.exception("Failed to read purchaserequest indexes; list_prs will run without hints")
+        return
+    for spec in (PR_STATUS_INDEX, PR_CREATED_INDEX):
+        if spec in existing:
+            available_pr_hints.add(tuple(spec))
+        else:
+            logger.warning("Index %s missing on purchaserequest; list_prs will not hint it", spec)
 
 
-def with_id(doc):
-    if not doc:
-        return doc
-    doc["id"] = str(doc.pop("_id"))
-    return doc
+class ResponseJsonCoder(Coder):
+    # Stores the body exactly as FastAPI would render it, so a cache hit returns the same
+    # JSON as a miss (the default JsonCoder re-parses datetimes as tz-aware values)
+    @classmethod
+    def encode(cls, value):
+        return orjson.dumps(jsonable_encoder(value))
+
+    @classmethod
+    def decode(cls, value):
+        return orjson.loads(value)
+
+
+@app.on_event("startup")
+async def init_cache():
+    # Master data is read-mostly. Without Redis there is no store shared by all workers,
+    # so caching is disabled rather than serving per-process entries that writes can't clear
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        FastAPICache.init(RedisBackend(aioredis.from_url(redis_url)), prefix="eproc", coder=ResponseJsonCoder)
+    else:
+        FastAPICache.init(InMemoryBackend(), prefix="eproc", enable=False)
+
+
+# ---------- Utilities ----------
+
+async def invalidate_cache(*namespaces: str):
+    # Runs after the database write has committed, so a cache outage must not fail the request
+    for namespace in namespaces:
+        try:
+            await FastAPICache.clear(namespace=namespace)
+        except Exception:
+            logger.warning("Failed to clear cache namespace %r", namespace, exc_info=True)
+
+
+_is_hex24 = re.compile(r"[0-9a-fA-F]{24}").fullmatch
+
+
+def oid(id_str: str) -> ObjectId:
+    # Any 24-char hex string is a valid ObjectId, so the regex is the only check needed
+    if isinstance(id_str, str) and _is_hex24(id_str):
+        return ObjectId(id_str)
+    raise HTTPException(status_code=400, detail="Invalid id format")
+
+
+# Aggregation stages exposing _id as a string "id", so documents need no Python-side rewrite
+ID_AS_STRING = [{"$addFields": {"id": {"$toString": "$_id"}}}, {"$project": {"_id": 0}}]
+
+
+async def paginate(collection: str, q: dict, limit: int, before: Optional[str], hint: Optional[dict] = None):
+    """Keyset-paginate a collection newest first; the cursor is "<created_at>_<id>" of the last item."""
+    if before:
+        created_str, _, id_str = before.rpartition("_")
+        try:
+            created_at = datetime.fromisoformat(created_str)
+        except ValueError:
+            raise HTTPException(400, detail="Invalid before cursor")
+        if not _is_hex24(id_str):
+            raise HTTPException(400, detail="Invalid before cursor")
+        # _id breaks ties between documents stamped in the same millisecond
+        q["created_at"] = {"$lte": created_at}
+        q["$or"] = [{"created_at": {"$lt": created_at}}, {"_id": {"$lt": ObjectId(id_str)}}]
+    pipeline = [{"$match": q}, {"$sort": {"created_at": -1, "_id": -1}}, {"$limit": limit}, *ID_AS_STRING]
+    options = {"batchSize": limit}
+    if hint:
+        options["hint"] = hint
+    docs = await db[collection].aggregate(pipeline, **options).to_list(length=limit)
+    next_cursor = None
+    if len(docs) == limit:
+        last = docs[-1]
+        next_cursor = f"{last['created_at'].isoformat()}_{last['id']}"
+    return ORJSONResponse({"items": docs, "next_cursor": next_cursor})
 
 
 # ---------- Models for requests ----------
@@ -72,7 +194,7 @@ class PRCreate(BaseModel):
     employee_id: str
     manager_id: str
     reason: Optional[str] = None
-    lines: List[PRLineIn]
+    lines: List[PRLineIn] = Field(..., max_length=MAX_LINES)
 
 
 class PRDecision(BaseModel):
@@ -95,18 +217,23 @@ class GRLineIn(BaseModel):
 
 class GRCreate(BaseModel):
     po_id: str
-    lines: List[GRLineIn]
+    lines: List[GRLineIn] = Field(..., max_length=MAX_LINES)
+
+
+# Built once at import so line lists are dumped in a single pydantic-core pass
+_pr_lines_adapter = TypeAdapter(List[PRLineIn])
+_gr_lines_adapter = TypeAdapter(List[GRLineIn])
 
 
 # ---------- Health ----------
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "E-Procurement Backend Running"}
 
 
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -122,7 +249,7 @@ def test_database():
             response["database_name"] = db.name if hasattr(db, "name") else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                response["collections"] = db.list_collection_names()
+                response["collections"] = await db.list_collection_names()
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
                 response["database"] = f"⚠️ Connected but Error: {str(e)[:80]}"
@@ -136,76 +263,89 @@ def test_database():
 # ---------- Users ----------
 
 @app.post("/users")
-def create_user(user: UserIn):
+async def create_user(user: UserIn):
     user_doc = user.model_dump()
     user_doc["is_active"] = True
-    new_id = create_document("user", user_doc)
+    new_id = await create_document("user", user_doc)
+    await invalidate_cache("users")
     return {"id": new_id}
 
 
 @app.get("/users")
-def list_users(role: Optional[str] = Query(default=None)):
+@cache(expire=60, namespace="users")
+async def list_users(role: Optional[str] = Query(default=None)):
     q = {"is_active": True}
     if role:
         q["role"] = role
-    users = db["user"].find(q).limit(100)
-    return [with_id(u) for u in users]
+    return await db["user"].aggregate([{"$match": q}, {"$limit": 100}, *ID_AS_STRING]).to_list(length=100)
 
 
 # ---------- Master data: Items, Suppliers, Inventory ----------
 
 @app.post("/suppliers")
-def create_supplier(s: SupplierIn):
-    new_id = create_document("supplier", s.model_dump())
+async def create_supplier(s: SupplierIn):
+    new_id = await create_document("supplier", s.model_dump())
+    await invalidate_cache("suppliers")
     return {"id": new_id}
 
 
 @app.get("/suppliers")
-def list_suppliers():
-    return [with_id(s) for s in db["supplier"].find({}).limit(100)]
+@cache(expire=60, namespace="suppliers")
+async def list_suppliers():
+    return await db["supplier"].aggregate([{"$limit": 100}, *ID_AS_STRING]).to_list(length=100)
 
 
 @app.post("/items")
-def create_item(item: ItemIn):
-    # Also initialize inventory record if not exists
-    item_id = create_document("item", item.model_dump())
-    inv = db["inventory"].find_one({"sku": item.sku})
-    if not inv:
-        create_document("inventory", {"sku": item.sku, "on_hand": 0, "uom": item.uom})
+async def create_item(item: ItemIn):
+    # Also initialize inventory record if not exists (upsert, issued concurrently with the item insert)
+    now = datetime.now(timezone.utc)
+    item_id, _ = await asyncio.gather(
+        create_document("item", item.model_dump()),
+        db["inventory"].update_one(
+            {"sku": item.sku},
+            {"$setOnInsert": {"on_hand": 0, "uom": item.uom, "created_at": now, "updated_at": now}},
+            upsert=True,
+        ),
+    )
+    await invalidate_cache("items", "inventory")
     return {"id": item_id}
 
 
 @app.get("/items")
-def list_items():
-    return [with_id(i) for i in db["item"].find({}).limit(200)]
+@cache(expire=60, namespace="items")
+async def list_items():
+    return await db["item"].aggregate([{"$limit": 200}, *ID_AS_STRING]).to_list(length=200)
 
 
 @app.get("/inventory")
-def get_inventory():
-    return [with_id(i) for i in db["inventory"].find({}).limit(500)]
+@cache(expire=60, namespace="inventory")
+async def get_inventory():
+    return await db["inventory"].aggregate([{"$limit": 500}, *ID_AS_STRING]).to_list(length=500)
 
 
 # ---------- Purchase Requests (PR) ----------
 
 @app.post("/prs")
-def create_pr(pr: PRCreate):
-    # Validate users
-    emp = db["user"].find_one({"_id": oid(pr.employee_id), "role": "employee"})
-    if not emp:
+async def create_pr(pr: PRCreate, background: BackgroundTasks):
+    # Validate users (both fetched in one round trip, roles checked client-side)
+    emp_id, mgr_id = oid(pr.employee_id), oid(pr.manager_id)
+    users = await db["user"].find({"_id": {"$in": [emp_id, mgr_id]}}, {"_id": 1, "role": 1}).to_list(length=2)
+    roles = {u["_id"]: u.get("role") for u in users}
+    if roles.get(emp_id) != "employee":
         raise HTTPException(400, detail="Invalid employee_id")
-    mgr = db["user"].find_one({"_id": oid(pr.manager_id), "role": "manager"})
-    if not mgr:
+    if roles.get(mgr_id) != "manager":
         raise HTTPException(400, detail="Invalid manager_id")
     pr_doc = {
         "employee_id": pr.employee_id,
         "manager_id": pr.manager_id,
         "reason": pr.reason,
-        "lines": [l.model_dump() for l in pr.lines],
+        "lines": _pr_lines_adapter.dump_python(pr.lines),
         "status": "submitted",
     }
-    pr_id = create_document("purchaserequest", pr_doc)
+    pr_id = await create_document("purchaserequest", pr_doc)
     # Notify manager
-    create_document(
+    background.add_task(
+        create_document,
         "notification",
         {
             "to_user_id": pr.manager_id,
@@ -221,7 +361,13 @@ def create_pr(pr: PRCreate):
 
 
 @app.get("/prs")
-def list_prs(status: Optional[str] = None, manager_id: Optional[str] = None, employee_id: Optional[str] = None):
+async def list_prs(
+    status: Optional[str] = None,
+    manager_id: Optional[str] = None,
+    employee_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[str] = None,
+):
     q = {}
     if status:
         q["status"] = status
@@ -229,27 +375,40 @@ def list_prs(status: Optional[str] = None, manager_id: Optional[str] = None, emp
         q["manager_id"] = manager_id
     if employee_id:
         q["employee_id"] = employee_id
-    cursor = db["purchaserequest"].find(q).sort("created_at", -1)
-    return [with_id(d) for d in cursor]
+    # Pin the plan: the compound index is only selective when its status prefix is bound,
+    # otherwise walk created_at in order and stop at the limit
+    # aggregate() sends hint as-is, so it must be an index document, not a key list
+    spec = PR_STATUS_INDEX if status else PR_CREATED_INDEX
+    hint = dict(spec) if tuple(spec) in available_pr_hints else None
+    return await paginate("purchaserequest", q, limit, before, hint=hint)
 
 
 @app.post("/prs/{pr_id}/decision")
-def decide_pr(pr_id: str, decision: PRDecision):
-    pr_doc = db["purchaserequest"].find_one({"_id": oid(pr_id)})
+async def decide_pr(pr_id: str, decision: PRDecision, background: BackgroundTasks):
+    pr_oid = oid(pr_id)
+    if decision.approve:
+        update = {"$set": {"status": "approved", "approved_by": decision.manager_id}, "$currentDate": {"approved_at": True}}
+    else:
+        update = {"$set": {"status": "rejected", "rejected_reason": decision.rejected_reason or ""}}
+    # Guard on status and manager in the filter so the transition is atomic
+    pr_doc = await db["purchaserequest"].find_one_and_update(
+        {"_id": pr_oid, "status": "submitted", "manager_id": decision.manager_id},
+        update,
+        projection={"employee_id": 1},
+        return_document=ReturnDocument.BEFORE,
+    )
     if not pr_doc:
-        raise HTTPException(404, detail="PR not found")
-    if pr_doc.get("manager_id") != decision.manager_id:
-        raise HTTPException(403, detail="Manager not assigned to this PR")
-    if pr_doc.get("status") not in ["submitted"]:
+        current = await db["purchaserequest"].find_one({"_id": pr_oid}, {"manager_id": 1})
+        if not current:
+            raise HTTPException(404, detail="PR not found")
+        if current.get("manager_id") != decision.manager_id:
+            raise HTTPException(403, detail="Manager not assigned to this PR")
         raise HTTPException(400, detail="PR is not pending approval")
 
     if decision.approve:
-        db["purchaserequest"].update_one(
-            {"_id": oid(pr_id)},
-            {"$set": {"status": "approved", "approved_by": decision.manager_id, "approved_at": datetime.now(timezone.utc)}},
-        )
         # Notify purchasing role
-        create_document(
+        background.add_task(
+            create_document,
             "notification",
             {
                 "to_user_id": None,
@@ -262,12 +421,9 @@ def decide_pr(pr_id: str, decision: PRDecision):
             },
         )
     else:
-        db["purchaserequest"].update_one(
-            {"_id": oid(pr_id)},
-            {"$set": {"status": "rejected", "rejected_reason": decision.rejected_reason or ""}},
-        )
         # Notify employee
-        create_document(
+        background.add_task(
+            create_document,
             "notification",
             {
                 "to_user_id": pr_doc.get("employee_id"),
@@ -285,30 +441,65 @@ def decide_pr(pr_id: str, decision: PRDecision):
 # ---------- Purchase Orders (PO) ----------
 
 @app.post("/pos")
-def create_po(data: POCreate):
-    pr_doc = db["purchaserequest"].find_one({"_id": oid(data.pr_id)})
-    if not pr_doc:
-        raise HTTPException(404, detail="PR not found")
-    if pr_doc.get("status") != "approved":
-        raise HTTPException(400, detail="PR is not approved")
-    supplier = db["supplier"].find_one({"_id": oid(data.supplier_id)})
+async def create_po(data: POCreate, background: BackgroundTasks):
+    pr_oid, supplier_oid = oid(data.pr_id), oid(data.supplier_id)
+    supplier = await db["supplier"].find_one({"_id": supplier_oid}, {"_id": 1})
     if not supplier:
         raise HTTPException(400, detail="Invalid supplier_id")
 
-    po_doc = {
-        "pr_id": data.pr_id,
-        "supplier_id": data.supplier_id,
-        "lines": [
-            {"sku": l["sku"], "name": l["name"], "qty": l["qty"], "uom": l["uom"]}
-            for l in pr_doc.get("lines", [])
-        ],
-        "status": "sent",
-    }
-    po_id = create_document("purchaseorder", po_doc)
-    db["purchaserequest"].update_one({"_id": oid(data.pr_id)}, {"$set": {"status": "ordered", "po_id": po_id}})
+    # Claim the PR first: the approved -> ordered transition is atomic, so concurrent
+    # requests for the same PR cannot both create a PO or overwrite each other's po_id
+    po_oid = ObjectId()
+    po_id = str(po_oid)
+    pr_doc = await db["purchaserequest"].find_one_and_update(
+        {"_id": pr_oid, "status": "approved"},
+        {"$set": {"status": "ordered", "po_id": po_id}},
+        projection={"employee_id": 1},
+    )
+    if not pr_doc:
+        if not await db["purchaserequest"].find_one({"_id": pr_oid}, {"_id": 1}):
+            raise HTTPException(404, detail="PR not found")
+        raise HTTPException(400, detail="PR is not approved")
+
+    # Copy PR lines into the new PO server-side so line data never round-trips through the app
+    try:
+        await db["purchaserequest"].aggregate(
+            [
+                {"$match": {"_id": pr_oid, "po_id": po_id}},
+                {
+                    "$project": {
+                        "_id": {"$literal": po_oid},
+                        "pr_id": {"$literal": data.pr_id},
+                        "supplier_id": {"$literal": data.supplier_id},
+                        "employee_id": "$employee_id",
+                        "lines": {
+                            "$map": {
+                                "input": "$lines",
+                                "as": "l",
+                                "in": {"sku": "$$l.sku", "name": "$$l.name", "qty": "$$l.qty", "uom": "$$l.uom"},
+                            }
+                        },
+                        "status": "sent",
+                        "created_at": "$$NOW",
+                        "updated_at": "$$NOW",
+                    }
+                },
+                {"$merge": {"into": "purchaseorder", "whenMatched": "fail", "whenNotMatched": "insert"}},
+            ]
+        ).to_list(length=None)
+    except Exception:
+        # The error may be ambiguous (e.g. a dropped connection) with the merge already applied;
+        # only release the PR for a retry when the PO is definitely absent. If this lookup fails
+        # too, the claim is kept rather than risking a second PO for the same PR.
+        if not await db["purchaseorder"].find_one({"_id": po_oid}, {"_id": 1}):
+            await db["purchaserequest"].update_one(
+                {"_id": pr_oid, "po_id": po_id}, {"$set": {"status": "approved"}, "$unset": {"po_id": ""}}
+            )
+            raise
 
     # Notify employee that PO has been created
-    create_document(
+    background.add_task(
+        create_document,
         "notification",
         {
             "to_user_id": pr_doc.get("employee_id"),
@@ -324,51 +515,65 @@ def create_po(data: POCreate):
 
 
 @app.get("/pos")
-def list_pos(status: Optional[str] = None):
+async def list_pos(status: Optional[str] = None, limit: int = Query(50, ge=1, le=500), before: Optional[str] = None):
     q = {}
     if status:
         q["status"] = status
-    return [with_id(p) for p in db["purchaseorder"].find(q).sort("created_at", -1)]
+    return await paginate("purchaseorder", q, limit, before)
 
 
 # ---------- Goods Receipt (GR) and Inventory Update ----------
 
 @app.post("/grs")
-def create_gr(data: GRCreate):
-    po = db["purchaseorder"].find_one({"_id": oid(data.po_id)})
+async def create_gr(data: GRCreate, background: BackgroundTasks):
+    po_oid = oid(data.po_id)
+    po = await db["purchaseorder"].find_one({"_id": po_oid}, {"employee_id": 1, "pr_id": 1, "lines.qty": 1})
     if not po:
         raise HTTPException(404, detail="PO not found")
 
     # Create GR document
-    gr_doc = {"po_id": data.po_id, "lines": [l.model_dump() for l in data.lines]}
-    gr_id = create_document("goodsreceipt", gr_doc)
+    gr_doc = {"po_id": data.po_id, "lines": _gr_lines_adapter.dump_python(data.lines)}
+    gr_id = await create_document("goodsreceipt", gr_doc)
 
-    # Update inventory for each line (upsert on sku)
-    for line in data.lines:
-        db["inventory"].update_one(
+    # Update inventory for all lines in one round trip (upsert on sku)
+    ops = [
+        UpdateOne(
             {"sku": line.sku},
             {"$inc": {"on_hand": float(line.qty_received)}, "$setOnInsert": {"uom": line.uom}},
             upsert=True,
         )
+        for line in data.lines
+    ]
+    if ops:
+        await db["inventory"].bulk_write(ops, ordered=False)
+        # Invalidate once the response is out, after the PO status update below
+        background.add_task(invalidate_cache, "inventory")
 
     # Update PO status
     total_po_qty = sum(float(l.get("qty", 0)) for l in po.get("lines", []))
-    total_received = 0.0
-    grs = db["goodsreceipt"].find({"po_id": data.po_id})
-    for g in grs:
-        for l in g.get("lines", []):
-            total_received += float(l.get("qty_received", 0))
+    agg = await db["goodsreceipt"].aggregate(
+        [
+            {"$match": {"po_id": data.po_id}},
+            {"$unwind": "$lines"},
+            {"$group": {"_id": None, "total": {"$sum": "$lines.qty_received"}}},
+        ]
+    ).to_list(length=1)
+    total_received = float(agg[0]["total"]) if agg else 0.0
     new_status = "received" if total_received >= total_po_qty else "partially_received"
-    db["purchaseorder"].update_one({"_id": oid(data.po_id)}, {"$set": {"status": new_status}})
-
-    # Notify employee that goods were received
-    # Find PR to get employee_id
-    pr = db["purchaserequest"].find_one({"_id": oid(po.get("pr_id"))})
-    if pr:
-        create_document(
+    await db["purchaseorder"].update_one({"_id": po_oid}, {"$set": {"status": new_status}})
+
+    # Notify employee that goods were received. employee_id is copied onto the PO at creation;
+    # POs created before that fall back to the PR lookup
+    employee_id = po.get("employee_id")
+    if not employee_id and po.get("pr_id"):
+        pr = await db["purchaserequest"].find_one({"_id": oid(po["pr_id"])}, {"employee_id": 1})
+        employee_id = pr.get("employee_id") if pr else None
+    if employee_id:
+        background.add_task(
+            create_document,
             "notification",
             {
-                "to_user_id": pr.get("employee_id"),
+                "to_user_id": employee_id,
                 "role": None,
                 "title": "Goods Received",
                 "message": f"GR {gr_id} recorded and inventory updated",
@@ -382,25 +587,30 @@ def create_gr(data: GRCreate):
 
 
 @app.get("/grs")
-def list_grs():
-    return [with_id(g) for g in db["goodsreceipt"].find({}).sort("created_at", -1)]
+async def list_grs(limit: int = Query(50, ge=1, le=500), before: Optional[str] = None):
+    return await paginate("goodsreceipt", {}, limit, before)
 
 
 # ---------- Notifications ----------
 
 @app.get("/notifications")
-def list_notifications(user_id: Optional[str] = None, role: Optional[str] = None):
+async def list_notifications(
+    user_id: Optional[str] = None,
+    role: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[str] = None,
+):
     q = {"read": False}
     if user_id:
         q["to_user_id"] = user_id
     if role:
         q["role"] = role
-    return [with_id(n) for n in db["notification"].find(q).sort("created_at", -1)]
+    return await paginate("notification", q, limit, before)
 
 
 @app.post("/notifications/{notif_id}/read")
-def mark_notification_read(notif_id: str):
-    db["notification"].update_one({"_id": oid(notif_id)}, {"$set": {"read": True, "updated_at": datetime.now(timezone.utc)}})
+async def mark_notification_read(notif_id: str):
+    await db["notification"].update_one({"_id": oid(notif_id)}, {"$set": {"read": True}, "$currentDate": {"updated_at": True}})
     return {"ok": True}
 
 
@@ -408,4 +618,5 @@ if __name__ == "__main__":
     import uvicorn
 
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 2))
+    uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers, loop="uvloop", http="httptools", log_level="warning")
@@ -18,6 +18,9 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
+# Upper bound on lines per PR/GR; keeps per-request work and document size bounded
+MAX_LINES = 500
+
 class User(BaseModel):
     name: str = Field(..., description="Full name")
     email: str = Field(..., description="Work email")
@@ -54,7 +57,7 @@ class PRLine(BaseModel):
 class PurchaseRequest(BaseModel):
     employee_id: str = Field(..., description="Employee who created")
     manager_id: str = Field(..., description="Approver manager user id")
-    lines: List[PRLine] = Field(..., description="Requested items")
+    lines: List[PRLine] = Field(..., max_length=MAX_LINES, description="Requested items")
     status: str = Field("submitted", description="submitted | approved | rejected | ordered")
     reason: Optional[str] = Field(None, description="Business justification")
     approved_by: Optional[str] = Field(None, description="Manager who approved")
@@ -71,6 +74,7 @@ class POLine(BaseModel):
 class PurchaseOrder(BaseModel):
     pr_id: str = Field(..., description="Source PR id")
     supplier_id: str = Field(..., description="Supplier id")
+    employee_id: Optional[str] = Field(None, description="Requesting employee id copied from the PR")
     lines: List[POLine]
     status: str = Field("sent", description="draft | sent | received | partially_received")
 
@@ -82,7 +86,7 @@ class GRLine(BaseModel):
 
 class GoodsReceipt(BaseModel):
     po_id: str
-    lines: List[GRLine]
+    lines: List[GRLine] = Field(..., max_length=MAX_LINES, description="Received items")
 
 class Notification(BaseModel):
     to_user_id: Optional[str] = Field(None, description="Recipient user id (optional)")